@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Async YouTube Fetch Pipeline
+
+An asyncio counterpart of the comment and video fetchers for crawling many channels
+at once. AsyncYouTubeClient talks to the same YouTube Data API v3 endpoints over
+httpx, with async generators over result pages. crawl_channels runs the fetches as
+a bounded producer/consumer pipeline: comment pages are queued as they arrive and
+scored by VADER in a process pool, so the network stays busy while scoring happens
+elsewhere, and the bounded queue keeps memory flat when scoring falls behind.
+
+Rate limited (429), server error (5xx) and network failures are retried with
+exponential backoff. Videos and channels that don't exist (404), videos with
+comments disabled and network failures that persist are logged and skipped. Any
+other error response, such as an exhausted quota (403), stops the whole crawl, as
+does an error while scoring, so partial results are never passed off as complete.
+
+Requirements:
+- Google API key
+- httpx library
+
+Usage:
+    python async_fetch.py @channel_one @channel_two --max-vids 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+from channel_videos import parse_channel_identifier
+from youtube_comments import YouTubeCommentsFetcher, MAX_QUERY_SIZE
+from vaderscores import GroupedVaderScores
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Module-level logger
+logger = logging.getLogger(__name__)
+
+API_URL = "https://www.googleapis.com/youtube/v3"
+
+# Maximum number of simultaneous connections to the API
+DEFAULT_MAX_CONNECTIONS = 100
+
+# Maximum number of videos whose comments are fetched at the same time
+DEFAULT_MAX_CONCURRENT_VIDEOS = 200
+
+# Maximum number of comment pages waiting to be scored
+DEFAULT_QUEUE_SIZE = 256
+
+# Number of times a rate limited, failed or timed out request is retried
+DEFAULT_MAX_RETRIES = 4
+
+# Delay before the first retry (seconds), doubled on every further retry
+DEFAULT_RETRY_BACKOFF = 1.0
+
+# Response statuses worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AsyncYouTubeClient:
+    """Fetches channel videos and video comments from the YouTube Data API v3 with asyncio."""
+
+    def __init__(self, api_key: str, max_connections: int = DEFAULT_MAX_CONNECTIONS, timeout: float = 30,
+                 max_retries: int = DEFAULT_MAX_RETRIES, retry_backoff: float = DEFAULT_RETRY_BACKOFF):
+        """
+        Initialize the AsyncYouTubeClient.
+
+        Args:
+            api_key: YouTube Data API key
+            max_connections: Maximum number of simultaneous connections
+            timeout: Request timeout in seconds
+            max_retries: Number of times a rate limited, failed or timed out request is retried
+            retry_backoff: Delay before the first retry in seconds, doubled on every further retry
+        """
+        if httpx is None:
+            raise ImportError("The async fetch pipeline requires httpx (pip install httpx)")
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.client = httpx.AsyncClient(
+            base_url=API_URL,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get(self, resource: str, **params) -> Dict:
+        """
+        GET an API resource, retrying rate limited, failed and timed out requests with exponential backoff.
+
+        Raises httpx.HTTPStatusError on error responses and httpx.RequestError on network failures
+        that persist after the retries.
+        """
+        params = {name: value for name, value in params.items() if value is not None}
+        params['key'] = self.api_key
+        for attempt in range(self.max_retries + 1):
+            retry = attempt < self.max_retries
+            try:
+                response = await self.client.get(f"/{resource}", params=params)
+            except httpx.RequestError as e:
+                if not retry:
+                    raise
+                logger.warning(f"Request for {resource} failed ({e!r}), retrying")
+            else:
+                if not retry or response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                logger.warning(f"Request for {resource} returned {response.status_code}, retrying")
+            await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    async def get_channel_id(self, username: str) -> Optional[str]:
+        """
+        Get channel ID from username or channel URL.
+
+        Args:
+            username: YouTube username, channel URL, or handle
+
+        Returns:
+            Channel ID if found, None otherwise
+
+        Raises:
+            httpx.HTTPStatusError: On error responses other than 404, e.g. when the quota is exhausted
+        """
+        kind, value = parse_channel_identifier(username)
+        if kind == 'id':
+            return value
+        if kind is None:
+            return None
+        lookup = {'forHandle': value} if kind == 'handle' else {'forUsername': value}
+        try:
+            response = await self._get('channels', part='id', **lookup)
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Error fetching channel ID: {e}")
+            if not _is_permanent_error(e):
+                raise
+            return None
+        except httpx.RequestError as e:
+            logger.error(f"Error fetching channel ID: {e!r}")
+            return None
+        if response.get('items'):
+            return response['items'][0]['id']
+        return None
+
+    async def iter_video_id_pages(self, channel_id: str) -> AsyncIterator[List[str]]:
+        """
+        Yield pages of a channel's video IDs, newest first.
+
+        Args:
+            channel_id: YouTube channel ID
+
+        Raises:
+            httpx.HTTPStatusError: On error responses other than 404, e.g. when the quota is exhausted
+        """
+        next_page_token = None
+        while True:
+            try:
+                response = await self._get(
+                    'search',
+                    part='id',
+                    channelId=channel_id,
+                    type='video',
+                    maxResults=50,
+                    pageToken=next_page_token,
+                    order='date'
+                )
+            except httpx.HTTPStatusError as e:
+                _log_status_error(e, "Channel not found.", f"Error fetching videos for channel {channel_id}")
+                if not _is_permanent_error(e):
+                    raise
+                return
+            except httpx.RequestError as e:
+                logger.error(f"Error fetching videos for channel {channel_id}: {e!r}")
+                return
+
+            yield [item['id']['videoId'] for item in response['items'] if item['id']['kind'] == 'youtube#video']
+
+            next_page_token = response.get('nextPageToken')
+            if not next_page_token:
+                return
+
+    async def iter_comment_pages(self, video_id: str, max_comments: int) -> AsyncIterator[List[Dict]]:
+        """
+        Yield pages of a video's comments (top level comments and their replies), up to max_comments in total.
+
+        Args:
+            video_id: YouTube video ID
+            max_comments: Maximum number of comments to fetch
+
+        Raises:
+            httpx.HTTPStatusError: On error responses other than 404 or comments disabled, e.g. when the
+                quota is exhausted
+        """
+        fetched = 0
+        next_page_token = None
+        while fetched < max_comments:
+            try:
+                response = await self._get(
+                    'commentThreads',
+                    part='snippet,replies',
+                    videoId=video_id,
+                    maxResults=min(MAX_QUERY_SIZE, max_comments - fetched),
+                    pageToken=next_page_token,
+                    order='relevance'
+                )
+            except httpx.HTTPStatusError as e:
+                _log_status_error(e, "Video not found or comments disabled.", f"Error fetching comments on video {video_id}")
+                if not _is_permanent_error(e):
+                    raise
+                return
+            except httpx.RequestError as e:
+                logger.error(f"Error fetching comments on video {video_id}: {e!r}")
+                return
+
+            page = []
+            for item in response['items']:
+                if fetched >= max_comments:
+                    break
+                comment = YouTubeCommentsFetcher._extract_comment_data(item)
+                page.append(comment)
+                fetched += 1
+                for reply in item.get('replies', {}).get('comments', []):
+                    if fetched >= max_comments:
+                        break
+                    page.append(YouTubeCommentsFetcher._extract_reply_data(reply, comment['id']))
+                    fetched += 1
+            if page:
+                yield page
+
+            next_page_token = response.get('nextPageToken')
+            if not next_page_token:
+                return
+
+
+def _is_permanent_error(e: "httpx.HTTPStatusError") -> bool:
+    """Whether an error means the resource can't be fetched at all (rather than not right now)."""
+    return e.response.status_code == 404 or b'commentsDisabled' in e.response.content
+
+
+async def _gather_or_cancel(*aws):
+    """Like asyncio.gather, but cancels the remaining awaitables as soon as one of them fails."""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _log_status_error(e: "httpx.HTTPStatusError", not_found_message: str, other_message: str):
+    status = e.response.status_code
+    if status == 403:
+        logger.error("API quota exceeded or access denied. Please check your API key and quota.")
+    elif status == 404:
+        logger.error(not_found_message)
+    else:
+        logger.error(f"{other_message}: {e}")
+
+
+def score_texts(texts: List[str]) -> List[Dict]:
+    """Score a batch of comment texts with VADER. Runs in an executor worker."""
+    from comment_analysis import get_polarity_scores
+    return [get_polarity_scores(text) for text in texts]
+
+
+async def crawl_channels(channel_identifiers: List[str], api_key: str, max_vids: int = 50, max_comments: int = 1000,
+                         bucket: str = "week", max_concurrent_videos: int = DEFAULT_MAX_CONCURRENT_VIDEOS,
+                         queue_size: int = DEFAULT_QUEUE_SIZE, executor: Optional[Executor] = None,
+                         scorers: Optional[int] = None, max_connections: int = DEFAULT_MAX_CONNECTIONS) -> Dict[str, GroupedVaderScores]:
+    """
+    Fetch and score the comments of several channels concurrently.
+
+    Args:
+        channel_identifiers: Channel IDs, usernames, or URLs
+        api_key: YouTube Data API key
+        max_vids: Number of most recent videos to score per channel
+        max_comments: Maximum number of comments to fetch per video
+        bucket: Time bucket size of the grouped scores ("day", "week" or "month")
+        max_concurrent_videos: Maximum number of videos fetched at the same time
+        queue_size: Maximum number of comment pages waiting to be scored
+        executor: Executor to score comments in (defaults to a process pool with one process per CPU)
+        scorers: Number of comment pages scored at the same time (defaults to the number of CPUs)
+        max_connections: Maximum number of simultaneous API connections
+
+    Returns:
+        Dictionary mapping each channel identifier that could be resolved to its grouped scores
+
+    Raises:
+        httpx.HTTPStatusError: If the API answers with an error that isn't specific to one video or channel,
+            e.g. when the quota is exhausted
+    """
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor()
+    scorers = scorers or os.cpu_count() or 1
+
+    pages: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    video_slots = asyncio.Semaphore(max_concurrent_videos)
+    results: Dict[str, GroupedVaderScores] = {}
+
+    async with AsyncYouTubeClient(api_key, max_connections=max_connections) as client:
+
+        async def fetch_video(channel: str, video_id: str):
+            async with video_slots:
+                try:
+                    async for page in client.iter_comment_pages(video_id, max_comments):
+                        await pages.put((channel, video_id, page))
+                except httpx.HTTPStatusError:
+                    # Quota exhausted or similar: the other videos would fail the same way
+                    raise
+                except Exception as e:
+                    # One broken video shouldn't take the rest of the crawl down with it
+                    logger.error(f"Skipping video {video_id} of channel {channel}: {e!r}")
+
+        async def produce(channel: str):
+            channel_id = await client.get_channel_id(channel)
+            if not channel_id:
+                logger.error(f"Error: Could not find channel with identifier: {channel}")
+                return
+            results[channel] = GroupedVaderScores(bucket=bucket)
+
+            video_ids = []
+            async for page in client.iter_video_id_pages(channel_id):
+                video_ids.extend(page)
+                if len(video_ids) >= max_vids:
+                    break
+            logger.info(f"Crawling {min(len(video_ids), max_vids)} videos of channel {channel}")
+            await _gather_or_cancel(*(fetch_video(channel, video_id) for video_id in video_ids[:max_vids]))
+
+        async def consume():
+            while True:
+                item = await pages.get()
+                if item is None:
+                    return
+                channel, video_id, page = item
+                scores = await loop.run_in_executor(executor, score_texts, [comment['text'] for comment in page])
+                for comment, score in zip(page, scores):
+                    results[channel].add_score(score, comment['like_count'], video_id, comment['published_at'])
+
+        async def produce_all():
+            await _gather_or_cancel(*(produce(channel) for channel in channel_identifiers))
+            for _ in consumers:
+                await pages.put(None)
+
+        consumers = [asyncio.create_task(consume()) for _ in range(scorers)]
+        producers = asyncio.create_task(produce_all())
+        tasks = [producers, *consumers]
+        try:
+            # Watch the consumers too: if scoring fails, the producers would block on the full queue forever
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if own_executor:
+                executor.shutdown()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate several YouTube channels concurrently")
+    parser.add_argument('channels', nargs='+', help="Channel IDs, usernames, or URLs")
+    parser.add_argument('--max-vids', type=int, default=50)
+    parser.add_argument('--max-comments', type=int, default=1000)
+    parser.add_argument('--max-concurrent-videos', type=int, default=DEFAULT_MAX_CONCURRENT_VIDEOS)
+    args = parser.parse_args()
+
+    try:
+        from config import YOUTUBE_API_KEY
+    except ImportError:
+        logger.error("Error: YOUTUBE_API_KEY not found in config.py")
+        sys.exit(1)
+
+    try:
+        results = asyncio.run(crawl_channels(args.channels, YOUTUBE_API_KEY, max_vids=args.max_vids,
+                                             max_comments=args.max_comments,
+                                             max_concurrent_videos=args.max_concurrent_videos))
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Crawl aborted: {e}")
+        sys.exit(1)
+    for channel, scores in results.items():
+        print(f"{channel}: Kindness {scores.total.kindness()}, Volatility {scores.total.volatility()} "
+              f"({scores.total.count} comments)")
+
+
+if __name__ == '__main__':
+    from setup_logging import setup_logging
+    logger = setup_logging()
+    main()
@@ -19,25 +19,65 @@ import sys
 import time
 import re
 import logging
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from http_pool import HttpPool
+from metadata_cache import MetadataCache, channel_snippet, channel_statistics, video_snippet, video_statistics
 
 # Module-level logger
 logger = logging.getLogger(__name__)
 
 
+def parse_channel_identifier(username: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Work out what kind of channel identifier a username, channel URL, or handle is.
+    
+    Args:
+        username: YouTube username, channel URL, or handle
+        
+    Returns:
+        ('id', channel ID), ('handle', handle without @), ('username', legacy username),
+        or (None, None) for unrecognized URLs
+    """
+    # Handle different URL formats
+    if username.startswith('@'):
+        # Handle new @username format
+        return 'handle', username[1:]  # Remove @ symbol
+    elif 'youtube.com' in username:
+        # Extract username/handle from URL
+        if '/@' in username:
+            return 'handle', username.split('/@')[-1].split('/')[0].split('?')[0]
+        elif '/channel/' in username:
+            # Direct channel ID in URL
+            return 'id', username.split('/channel/')[-1].split('/')[0].split('?')[0]
+        elif '/c/' in username or '/user/' in username:
+            # Legacy username format
+            return 'username', username.split('/')[-1].split('?')[0]
+        return None, None
+    elif len(username) == 24 and username.isalnum():  # Channel ID format
+        return 'id', username
+    else:
+        # Try as username
+        return 'username', username
+
+
 class YouTubeChannelVideoFetcher:
     """Fetches video IDs from YouTube channels using the YouTube Data API v3."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, http_pool: Optional[HttpPool] = None,
+                 metadata_cache: Optional[MetadataCache] = None):
         """
         Initialize the YouTubeChannelVideoFetcher.
         
         Args:
             api_key: YouTube Data API key
+            http_pool: Connection pool to run requests on. Required to share the fetcher between threads
+            metadata_cache: Cache for channel IDs, channel info and video details
         """
         self.api_key = api_key
+        self.http_pool = http_pool
+        self.metadata_cache = metadata_cache
         self.youtube = None
         self._initialize_api()
     
@@ -53,6 +93,23 @@ class YouTubeChannelVideoFetcher:
             logger.error(f"Error initializing YouTube API: {e}")
             sys.exit(1)
     
+    def _execute(self, request) -> Dict:
+        """Execute an API request, on a pooled connection if the fetcher has a pool."""
+        if self.http_pool:
+            return self.http_pool.execute(request)
+        return request.execute()
+    
+    def _cached(self, kind: str, key: str) -> Tuple[bool, Any]:
+        """Look up a metadata cache entry, as a (hit, value) tuple."""
+        if self.metadata_cache is None:
+            return False, None
+        return self.metadata_cache.get(kind, key)
+    
+    def _store(self, kind: str, key: str, value: Any):
+        """Store a metadata cache entry, if the fetcher has a cache."""
+        if self.metadata_cache is not None:
+            self.metadata_cache.set(kind, key, value)
+    
     def get_channel_id_from_username(self, username: str) -> Optional[str]:
         """
         Get channel ID from username or channel URL.
@@ -63,65 +120,42 @@ class YouTubeChannelVideoFetcher:
         Returns:
             Channel ID if found, None otherwise
         """
+        hit, channel_id = self._cached('channel_id', username)
+        if hit:
+            return channel_id
+
         logger.info(f"Getting channel ID for username \"{username}\"")
         try:
-            # Handle different URL formats
-            if username.startswith('@'):
-                # Handle new @username format
-                handle = username[1:]  # Remove @ symbol
-                request = self.youtube.channels().list(
-                    part='id',
-                    forHandle=handle
-                )
-                response = request.execute()
-                
-                if response['items']:
-                    return response['items'][0]['id']
-                    
-            elif 'youtube.com' in username:
-                # Extract username/handle from URL
-                if '/@' in username:
-                    handle = username.split('/@')[-1].split('/')[0].split('?')[0]
-                    request = self.youtube.channels().list(
-                        part='id',
-                        forHandle=handle
-                    )
-                    response = request.execute()
-                    
-                    if response['items']:
-                        return response['items'][0]['id']
-                elif '/channel/' in username:
-                    # Direct channel ID in URL
-                    return username.split('/channel/')[-1].split('/')[0].split('?')[0]
-                elif '/c/' in username or '/user/' in username:
-                    # Legacy username format
-                    username_part = username.split('/')[-1].split('?')[0]
-                    request = self.youtube.channels().list(
-                        part='id',
-                        forUsername=username_part
-                    )
-                    response = request.execute()
-                    
-                    if response['items']:
-                        return response['items'][0]['id']
-            else:
-                # Assume it's already a channel ID or username
-                if len(username) == 24 and username.isalnum():  # Channel ID format
-                    return username
-                else:
-                    # Try as username
-                    request = self.youtube.channels().list(
-                        part='id',
-                        forUsername=username
-                    )
-                    response = request.execute()
-                    
-                    if response['items']:
-                        return response['items'][0]['id']
-                        
+            channel_id = self._lookup_channel_id(username)
         except HttpError as e:
             logger.error(f"Error fetching channel ID: {e}")
-            
+            return None
+
+        # Unknown usernames are cached too, so they aren't looked up again right away
+        self._store('channel_id', username, channel_id)
+        return channel_id
+    
+    def _lookup_channel_id(self, username: str) -> Optional[str]:
+        """Resolve a username, channel URL, or handle through the API. HttpErrors are left to the caller."""
+        kind, value = parse_channel_identifier(username)
+        if kind == 'id':
+            return value
+        elif kind == 'handle':
+            request = self.youtube.channels().list(
+                part='id',
+                forHandle=value
+            )
+        elif kind == 'username':
+            request = self.youtube.channels().list(
+                part='id',
+                forUsername=value
+            )
+        else:
+            return None
+        
+        response = self._execute(request)
+        if response['items']:
+            return response['items'][0]['id']
         return None
     
     def get_channel_info(self, channel_id: str) -> Optional[Dict]:
@@ -134,30 +168,44 @@ class YouTubeChannelVideoFetcher:
         Returns:
             Dictionary containing channel information
         """
-        try:
-            request = self.youtube.channels().list(
-                part='snippet,statistics',
-                id=channel_id
-            )
-            response = request.execute()
-            
-            if not response['items']:
-                return None
-            
-            channel = response['items'][0]
-            return {
-                'id': channel['id'],
-                'title': channel['snippet']['title'],
-                'description': channel['snippet']['description'],
-                'custom_url': channel['snippet'].get('customUrl'),
-                'published_at': channel['snippet']['publishedAt'],
-                'subscriber_count': channel['statistics'].get('subscriberCount', 0),
-                'video_count': channel['statistics'].get('videoCount', 0),
-                'view_count': channel['statistics'].get('viewCount', 0)
-            }
-        except HttpError as e:
-            logger.error(f"Error fetching channel info: {e}")
+        snippet_hit, snippet = self._cached('channel_snippet', channel_id)
+        if snippet_hit and snippet is None:
             return None
+        statistics_hit, statistics = self._cached('channel_statistics', channel_id)
+
+        if not (snippet_hit and statistics_hit):
+            try:
+                request = self.youtube.channels().list(
+                    # Only refresh the counts if the title etc. are still cached
+                    part='statistics' if snippet_hit else 'snippet,statistics',
+                    id=channel_id
+                )
+                response = self._execute(request)
+                
+                if not response['items']:
+                    self._store('channel_snippet', channel_id, None)
+                    return None
+                
+                channel = response['items'][0]
+                if not snippet_hit:
+                    snippet = channel_snippet(channel)
+                    self._store('channel_snippet', channel_id, snippet)
+                statistics = channel_statistics(channel)
+                self._store('channel_statistics', channel_id, statistics)
+            except HttpError as e:
+                logger.error(f"Error fetching channel info: {e}")
+                return None
+
+        return {
+            'id': channel_id,
+            'title': snippet['title'],
+            'description': snippet['description'],
+            'custom_url': snippet['custom_url'],
+            'published_at': snippet['published_at'],
+            'subscriber_count': statistics['subscriber_count'],
+            'video_count': statistics['video_count'],
+            'view_count': statistics['view_count']
+        }
     
     def get_all_video_ids(self, channel_id: str, max_results: int = 50) -> List[str]:
         """
@@ -187,7 +235,7 @@ class YouTubeChannelVideoFetcher:
                     order='date'  # Order by upload date (newest first)
                 )
                 
-                response = request.execute()
+                response = self._execute(request)
                 
                 # Extract video IDs
                 for item in response['items']:
@@ -227,40 +275,76 @@ class YouTubeChannelVideoFetcher:
         Returns:
             List of video detail dictionaries
         """
-        video_details = []
+        snippets = {}
+        statistics = {}
+        need_snippet = []  # Videos to fetch in full
+        need_statistics = []  # Videos whose title etc. are still cached, but not their counts
+        
+        for video_id in video_ids:
+            snippet_hit, snippet = self._cached('video_snippet', video_id)
+            statistics_hit, stats = self._cached('video_statistics', video_id)
+            if not snippet_hit:
+                need_snippet.append(video_id)
+            elif snippet is None:
+                continue  # Known to be deleted or private
+            elif not statistics_hit:
+                snippets[video_id] = snippet
+                need_statistics.append(video_id)
+            else:
+                snippets[video_id] = snippet
+                statistics[video_id] = stats
         
         # YouTube API allows up to 50 video IDs per request
         batch_size = 50
         
-        for i in range(0, len(video_ids), batch_size):
-            batch = video_ids[i:i + batch_size]
-            
-            try:
-                request = self.youtube.videos().list(
-                    part='snippet,statistics',
-                    id=','.join(batch)
-                )
-                response = request.execute()
-                
-                for video in response['items']:
-                    video_details.append({
-                        'id': video['id'],
-                        'title': video['snippet']['title'],
-                        'description': video['snippet']['description'],
-                        'published_at': video['snippet']['publishedAt'],
-                        'view_count': video['statistics'].get('viewCount', 0),
-                        'like_count': video['statistics'].get('likeCount', 0),
-                        'comment_count': video['statistics'].get('commentCount', 0),
-                        'duration': video['snippet'].get('duration', ''),
-                        'thumbnail_url': video['snippet']['thumbnails'].get('default', {}).get('url', '')
-                    })
-                
-                # Rate limiting
-                time.sleep(0.1)
+        for part, batch_ids in (('snippet,statistics', need_snippet), ('statistics', need_statistics)):
+            for i in range(0, len(batch_ids), batch_size):
+                batch = batch_ids[i:i + batch_size]
                 
-            except HttpError as e:
-                logger.error(f"Error fetching video details for batch: {e}")
+                try:
+                    request = self.youtube.videos().list(
+                        part=part,
+                        id=','.join(batch)
+                    )
+                    response = self._execute(request)
+                    
+                    for video in response['items']:
+                        if 'snippet' in video:
+                            snippets[video['id']] = video_snippet(video)
+                            self._store('video_snippet', video['id'], snippets[video['id']])
+                        statistics[video['id']] = video_statistics(video)
+                        self._store('video_statistics', video['id'], statistics[video['id']])
+                    
+                    # Videos missing from the response are deleted or private
+                    returned = {video['id'] for video in response['items']}
+                    for video_id in batch:
+                        if video_id not in returned:
+                            self._store('video_snippet', video_id, None)
+                    
+                    # Rate limiting
+                    time.sleep(0.1)
+                    
+                except HttpError as e:
+                    logger.error(f"Error fetching video details for batch: {e}")
+                    continue
+        
+        video_details = []
+        for video_id in video_ids:
+            if video_id not in snippets or video_id not in statistics:
                 continue
+            snippet = snippets[video_id]
+            stats = statistics[video_id]
+            video_details.append({
+                'id': video_id,
+                'title': snippet['title'],
+                'description': snippet['description'],
+                'published_at': snippet['published_at'],
+                'view_count': stats['view_count'],
+                'like_count': stats['like_count'],
+                'comment_count': stats['comment_count'],
+                'duration': snippet['duration'],
+                'thumbnail_url': snippet['thumbnail_url']
+            })
         
         return video_details
     
@@ -298,7 +382,8 @@ class YouTubeChannelVideoFetcher:
 
 def get_channel_videos(channel_identifier: str, output_ids_file: Optional[str] = None, 
                       output_details_file: Optional[str] = None, 
-                      include_details: bool = False, max_results: int = 50):
+                      include_details: bool = False, max_results: int = 50,
+                      metadata_cache: Optional[MetadataCache] = None):
     """
     Main function to get all videos from a YouTube channel.
     
@@ -308,6 +393,7 @@ def get_channel_videos(channel_identifier: str, output_ids_file: Optional[str] =
         output_details_file: File to save video details (optional)
         include_details: Whether to fetch detailed video information
         max_results: Maximum videos per API request
+        metadata_cache: Cache for the channel ID and video details (optional)
     """
     try:
         from config import YOUTUBE_API_KEY
@@ -316,7 +402,7 @@ def get_channel_videos(channel_identifier: str, output_ids_file: Optional[str] =
         sys.exit(1)
     
     # Initialize the fetcher
-    fetcher = YouTubeChannelVideoFetcher(api_key=YOUTUBE_API_KEY)
+    fetcher = YouTubeChannelVideoFetcher(api_key=YOUTUBE_API_KEY, metadata_cache=metadata_cache)
     
     # Get channel ID
     logger.info("Resolving channel identifier...")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Scored Comment Export
+
+Writes comments together with their Vader scores to a columnar Parquet file while a
+crawl is running. Rows are buffered and flushed as one Parquet row group per batch,
+so memory stays bounded no matter how many comments are exported, and downstream
+tools can read only the columns they need.
+
+Requirements:
+- pyarrow library (only needed when exporting)
+"""
+
+import logging
+from typing import Dict, List, Optional
+from vaderscores import like_weight
+
+# Module-level logger
+logger = logging.getLogger(__name__)
+
+# Number of comments per Parquet row group
+DEFAULT_BATCH_SIZE = 50_000
+
+# (column name, pyarrow type name) of every exported column, in file order
+COLUMNS = [
+    ('channel_id', 'string'),
+    ('video_id', 'string'),
+    ('comment_id', 'string'),
+    ('parent_id', 'string'),
+    ('is_reply', 'bool_'),
+    ('author_channel_id', 'string'),
+    ('published_at', 'string'),
+    ('like_count', 'int64'),
+    ('weight', 'float64'),
+    ('pos', 'float32'),
+    ('neu', 'float32'),
+    ('neg', 'float32'),
+    ('compound', 'float32'),
+    ('text', 'string'),
+]
+
+
+class ParquetCommentWriter:
+    """Streams scored comments to a Parquet file in row-group sized batches."""
+
+    def __init__(self, filename: str, batch_size: int = DEFAULT_BATCH_SIZE, include_text: bool = True):
+        """
+        Open a Parquet file for writing.
+
+        Args:
+            filename: Output filename
+            batch_size: Number of comments buffered before a row group is written
+            include_text: Whether to export the comment text column
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Exporting comments to Parquet requires pyarrow (pip install pyarrow)")
+
+        self.filename = filename
+        self.batch_size = batch_size
+        self.columns = [name for name, _ in COLUMNS if include_text or name != 'text']
+        self.schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in COLUMNS
+                                 if name in self.columns])
+        self._pa = pa
+        self._writer = pq.ParquetWriter(filename, self.schema, compression='zstd')
+        self._buffer: Dict[str, List] = {name: [] for name in self.columns}
+        self.rows_written = 0
+
+    def add_comment(self, comment: Dict, score: Dict, video_id: str, channel_id: Optional[str] = None):
+        """
+        Buffer one comment and its scores, writing a row group once the batch is full.
+
+        Args:
+            comment: Comment dictionary as returned by YouTubeCommentsFetcher
+            score: Vader polarity scores of the comment
+            video_id: ID of the video the comment belongs to
+            channel_id: ID of the channel the video belongs to
+        """
+        row = {
+            'channel_id': channel_id,
+            'video_id': video_id,
+            'comment_id': comment['id'],
+            'parent_id': comment['parent_id'],
+            'is_reply': comment['is_reply'],
+            'author_channel_id': comment['author_channel_id'],
+            'published_at': comment['published_at'],
+            'like_count': comment['like_count'],
+            'weight': like_weight(comment['like_count']),
+            'pos': score['pos'],
+            'neu': score['neu'],
+            'neg': score['neg'],
+            'compound': score.get('compound'),
+            'text': comment['text'],
+        }
+        for name in self.columns:
+            self._buffer[name].append(row[name])
+
+        if len(self._buffer['comment_id']) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write any buffered comments as a row group."""
+        count = len(self._buffer['comment_id'])
+        if count == 0:
+            return
+        table = self._pa.Table.from_pydict(self._buffer, schema=self.schema)
+        self._writer.write_table(table)
+        self.rows_written += count
+        self._buffer = {name: [] for name in self.columns}
+        logger.debug(f"  Wrote {count} comments to {self.filename} ({self.rows_written} total)")
+
+    def close(self):
+        """Flush the remaining comments and finalize the file."""
+        self.flush()
+        self._writer.close()
+        logger.info(f"Exported {self.rows_written} scored comments to {self.filename}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+if __name__ == '__main__':
+    """Unit test: export a couple of made-up comments and read them back"""
+    import os
+    import tempfile
+    import pyarrow.parquet as pq
+
+    sample_comment = {
+        'id': 'c1', 'parent_id': None, 'author': 'someone', 'author_channel_id': 'UC123',
+        'text': 'Great video!', 'like_count': 4, 'published_at': '2024-03-01T10:00:00Z',
+        'updated_at': '2024-03-01T10:00:00Z', 'is_reply': False
+    }
+    sample_score = {'neg': 0.0, 'neu': 0.2, 'pos': 0.8, 'compound': 0.66}
+    with tempfile.TemporaryDirectory() as directory:
+        test_path = os.path.join(directory, 'comment_export_test.parquet')
+        with ParquetCommentWriter(test_path, batch_size=1) as writer:
+            writer.add_comment(sample_comment, sample_score, video_id='vid_a', channel_id='UC_channel')
+            writer.add_comment(dict(sample_comment, id='c2'), sample_score, video_id='vid_a', channel_id='UC_channel')
+        print(pq.read_table(test_path, columns=['comment_id', 'pos', 'weight']))
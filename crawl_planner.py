@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Crawl Planner
+
+Decides how many comments to fetch from each video of a channel, given a total
+comment or API quota budget, instead of spending the same budget on every video.
+
+A comment budget is split in comments, so a video with 5 comments costs 5 of it.
+A quota budget is split in pages: each commentThreads request costs one quota unit
+and returns one page of up to MAX_QUERY_SIZE comment threads, however few comments
+the video has. When both are given, the quota is split first and the comments are
+then split within each video's pages.
+
+When the budget allows, every video with comments gets at least its first page
+(or all of its comments, if fewer), and the rest is split by largest-remainder
+rounding so no share is lost to rounding down.
+
+Policies:
+- proportional: in proportion to each video's comment count
+- recency: videos are split into strata by publish time, each stratum gets an
+  equal share of the budget, spent proportionally within the stratum
+- capped: an equal share per video; small videos take only what they have and
+  their unused share goes to the others
+
+Every policy respects an optional per-video cap, never plans more comments than a
+video has or than the comment budget, and skips videos that were already crawled.
+"""
+
+import math
+import logging
+from typing import Dict, Iterable, List, Optional
+from youtube_comments import MAX_QUERY_SIZE
+
+# Module-level logger
+logger = logging.getLogger(__name__)
+
+POLICIES = ('proportional', 'recency', 'capped')
+
+# Number of recency strata used by the 'recency' policy
+DEFAULT_STRATA = 4
+
+
+def plan_crawl(video_details: List[Dict], comment_budget: Optional[int] = None, quota_budget: Optional[int] = None,
+               policy: str = 'proportional', cap: Optional[int] = None, strata: int = DEFAULT_STRATA,
+               crawled: Optional[Iterable[str]] = None) -> List[Dict]:
+    """
+    Allocate a comment or quota budget across videos.
+
+    Args:
+        video_details: Video detail dictionaries as returned by YouTubeChannelVideoFetcher.get_video_details
+        comment_budget: Maximum number of comments to fetch in total
+        quota_budget: Maximum number of API quota units (comment pages) to spend in total
+        policy: One of POLICIES
+        cap: Maximum number of comments to fetch from any one video
+        strata: Number of recency strata for the 'recency' policy
+        crawled: IDs of videos that were already crawled and are left out of the plan
+
+    Returns:
+        List of {'id', 'max_comments', 'pages', 'comment_count', 'published_at'} dictionaries,
+        largest allocations first. Videos that get no budget are left out.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+    if comment_budget is None and quota_budget is None:
+        raise ValueError("Either comment_budget or quota_budget must be given")
+    for name, budget in (('comment_budget', comment_budget), ('quota_budget', quota_budget)):
+        if budget is not None and budget < 0:
+            raise ValueError(f"{name} must not be negative, got {budget}")
+
+    crawled = set(crawled or ())
+    videos = [video for video in video_details if video['id'] not in crawled]
+
+    # Number of comments wanted from each video
+    wanted = {}
+    for video in videos:
+        wanted[video['id']] = int(video['comment_count'])
+        if cap is not None:
+            wanted[video['id']] = min(wanted[video['id']], cap)
+
+    if quota_budget is not None:
+        page_capacities = {video_id: math.ceil(count / MAX_QUERY_SIZE) for video_id, count in wanted.items()}
+        pages = _allocate_by_policy(policy, videos, page_capacities, quota_budget, strata, minimum=1)
+        wanted = {video_id: min(count, pages[video_id] * MAX_QUERY_SIZE) for video_id, count in wanted.items()}
+
+    if comment_budget is not None:
+        comments = _allocate_by_policy(policy, videos, wanted, comment_budget, strata, minimum=MAX_QUERY_SIZE)
+    else:
+        comments = wanted
+
+    plan = []
+    for video in videos:
+        max_comments = comments[video['id']]
+        if max_comments == 0:
+            continue
+        plan.append({
+            'id': video['id'],
+            'max_comments': max_comments,
+            'pages': math.ceil(max_comments / MAX_QUERY_SIZE),
+            'comment_count': int(video['comment_count']),
+            'published_at': video['published_at']
+        })
+    plan.sort(key=lambda entry: (-entry['max_comments'], entry['id']))
+
+    planned_comments = sum(entry['max_comments'] for entry in plan)
+    planned_pages = sum(entry['pages'] for entry in plan)
+    if comment_budget is not None and planned_comments > comment_budget:
+        raise RuntimeError(f"Planned {planned_comments} comments, over the budget of {comment_budget}")
+    if quota_budget is not None and planned_pages > quota_budget:
+        raise RuntimeError(f"Planned {planned_pages} pages, over the quota budget of {quota_budget}")
+
+    logger.info(f"Planned {planned_comments} comments ({planned_pages} pages) across {len(plan)} of "
+                f"{len(videos)} videos ({policy} policy)")
+    return plan
+
+
+def _allocate_by_policy(policy: str, videos: List[Dict], capacities: Dict[str, int], budget: int, strata: int,
+                        minimum: int) -> Dict[str, int]:
+    """Split budget units (comments or pages) across videos according to policy."""
+    if policy == 'proportional':
+        weights = {video_id: float(units) for video_id, units in capacities.items()}
+        return _allocate(capacities, weights, budget, minimum)
+    if policy == 'capped':
+        weights = {video_id: 1.0 for video_id in capacities}
+        return _allocate(capacities, weights, budget, minimum)
+    return _allocate_by_recency(videos, capacities, budget, strata, minimum)
+
+
+def _allocate(capacities: Dict[str, int], weights: Dict[str, float], budget: int,
+              minimum: int = 1) -> Dict[str, int]:
+    """
+    Split budget units across videos in proportion to their weights, without giving any video more than
+    its capacity. Budget freed up by videos that hit their capacity is split again among the rest.
+
+    If the budget covers it, every video with capacity first gets minimum units (or its whole capacity,
+    if smaller) before the rest is split. Shares are rounded by largest remainder, so the units lost to
+    rounding down go to the videos whose shares were rounded down the most.
+    """
+    allocation = {video_id: 0 for video_id in capacities}
+    open_ids = sorted(video_id for video_id, capacity in capacities.items() if capacity > 0)
+
+    first_shares = {video_id: min(minimum, capacities[video_id]) for video_id in open_ids}
+    if minimum > 0 and open_ids and sum(first_shares.values()) <= budget:
+        allocation.update(first_shares)
+        budget -= sum(first_shares.values())
+        open_ids = [video_id for video_id in open_ids if allocation[video_id] < capacities[video_id]]
+
+    while budget > 0 and open_ids:
+        total_weight = sum(weights[video_id] for video_id in open_ids)
+        if total_weight > 0:
+            quotas = {video_id: budget * weights[video_id] / total_weight for video_id in open_ids}
+        else:
+            quotas = {video_id: budget / len(open_ids) for video_id in open_ids}
+        shares = {video_id: int(quota) for video_id, quota in quotas.items()}
+        # Ties go to the video with the fewest units so far, then the heaviest
+        by_remainder = sorted(open_ids, key=lambda video_id: (shares[video_id] - quotas[video_id], allocation[video_id],
+                                                              -weights[video_id], video_id))
+        for video_id in by_remainder[:budget - sum(shares.values())]:
+            shares[video_id] += 1
+
+        for video_id in open_ids:
+            share = min(shares[video_id], capacities[video_id] - allocation[video_id])
+            allocation[video_id] += share
+            budget -= share
+        open_ids = [video_id for video_id in open_ids if allocation[video_id] < capacities[video_id]]
+
+    return allocation
+
+
+def _allocate_by_recency(videos: List[Dict], capacities: Dict[str, int], budget: int, strata: int,
+                         minimum: int = 1) -> Dict[str, int]:
+    """Give each recency stratum an equal share of the budget, spent proportionally within the stratum."""
+    newest_first = sorted(videos, key=lambda video: video['published_at'], reverse=True)
+    strata = max(1, min(strata, len(newest_first)))
+
+    allocation = {video_id: 0 for video_id in capacities}
+    for i in range(strata):
+        start, end = i * len(newest_first) // strata, (i + 1) * len(newest_first) // strata
+        stratum = [video['id'] for video in newest_first[start:end]]
+        # Newer strata get the units that don't divide evenly
+        share = budget // strata + (1 if i < budget % strata else 0)
+        allocation.update(_allocate(
+            {video_id: capacities[video_id] for video_id in stratum},
+            {video_id: float(capacities[video_id]) for video_id in stratum},
+            share,
+            minimum
+        ))
+
+    # Strata with less to fetch than their share leave budget over; spend it on the others
+    leftover = budget - sum(allocation.values())
+    if leftover > 0:
+        remaining = {video_id: capacities[video_id] - allocation[video_id] for video_id in capacities}
+        extra = _allocate(remaining, {video_id: float(units) for video_id, units in remaining.items()}, leftover,
+                          minimum=0)
+        for video_id, units in extra.items():
+            allocation[video_id] += units
+
+    return allocation
+
+
+if __name__ == '__main__':
+    """Unit test: split 20 pages across a handful of made-up videos with every policy"""
+    sample_videos = [
+        {'id': 'huge', 'comment_count': '50000', 'published_at': '2024-01-01T00:00:00Z'},
+        {'id': 'big', 'comment_count': '1500', 'published_at': '2024-02-01T00:00:00Z'},
+        {'id': 'medium', 'comment_count': '450', 'published_at': '2024-03-01T00:00:00Z'},
+        {'id': 'small', 'comment_count': '5', 'published_at': '2024-04-01T00:00:00Z'},
+        {'id': 'silent', 'comment_count': '0', 'published_at': '2024-05-01T00:00:00Z'},
+    ]
+    for sample_policy in POLICIES:
+        sample_plan = plan_crawl(sample_videos, quota_budget=20, policy=sample_policy)
+        print(f"{sample_policy}: {[(entry['id'], entry['pages'], entry['max_comments']) for entry in sample_plan]}")
+
+    # A comment budget is spent in comments: fifty 5-comment videos fit in 1000 comments, and no plan goes over
+    small_videos = [dict(sample_videos[3], id=f'small{i}') for i in range(50)]
+    for sample_budget in (50, 150, 1000):
+        for sample_policy in POLICIES:
+            sample_plan = plan_crawl(small_videos + sample_videos, comment_budget=sample_budget, policy=sample_policy)
+            planned = sum(entry['max_comments'] for entry in sample_plan)
+            assert planned <= sample_budget, (sample_policy, sample_budget, planned)
+            print(f"{sample_policy}, {sample_budget} comments: {planned} comments across {len(sample_plan)} videos")
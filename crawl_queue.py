@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Crawl Work Queue
+
+A resumable crawl mode where every video of a channel is a separate task in a SQLite
+file. Any number of worker processes can lease tasks from the same file, fetch and
+score the video's comments, and store the result as a partial GroupedVaderScores.
+A reducer then merges the finished partials into channel-wide scores.
+
+Tasks are leased for a limited time and only marked done once acknowledged, so a
+crashed worker's video is picked up again once its lease expires, and re-running a
+crawl never redoes videos that are already finished. Videos that ran out of attempts
+(e.g. because the API quota was exhausted) are marked failed and can be requeued.
+
+Several hosts can share one queue file over a network filesystem, provided that
+filesystem implements POSIX locks properly (SQLite relies on them).
+
+Usage:
+    python crawl_queue.py enqueue @channelname --queue crawl.db --max-vids 50
+    python crawl_queue.py enqueue @channelname --queue crawl.db --comment-budget 20000 --policy recency
+    python crawl_queue.py work --queue crawl.db --threads 8
+    python crawl_queue.py requeue @channelname --queue crawl.db
+    python crawl_queue.py reduce @channelname --queue crawl.db
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from vaderscores import GroupedVaderScores
+
+# Module-level logger
+logger = logging.getLogger(__name__)
+
+# How long a worker owns a task before another worker may take it over (seconds)
+DEFAULT_LEASE_SECONDS = 600
+
+# A task that has been leased this many times without being acknowledged is given up on
+DEFAULT_MAX_ATTEMPTS = 3
+
+# A worker stops after this many videos in a row failed (e.g. because the API quota is exhausted),
+# leaving the remaining tasks pending for a later run
+MAX_CONSECUTIVE_ERRORS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    max_comments INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    UNIQUE (channel, video_id)
+)
+"""
+
+
+class CrawlQueue:
+    """A file-based queue of per-video crawl tasks with lease/ack semantics."""
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Open (and if needed create) a crawl queue.
+
+        Args:
+            path: Path of the SQLite queue file
+            max_attempts: Number of leases after which an unacknowledged task is marked failed
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        # Autocommit mode; transactions that need it are opened explicitly
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, channel: str, video_ids: List[str], max_comments: int = 1000,
+                bucket: str = "week") -> int:
+        """
+        Add one task per video. Videos already queued for this channel are left untouched.
+
+        Args:
+            channel: Channel identifier the videos belong to
+            video_ids: List of YouTube video IDs
+            max_comments: Maximum number of comments to fetch per video
+            bucket: Time bucket size of the partial scores ("day", "week" or "month")
+
+        Returns:
+            Number of newly added tasks
+        """
+        return self.enqueue_plan(channel, [{'id': video_id, 'max_comments': max_comments} for video_id in video_ids],
+                                 bucket)
+
+    def enqueue_plan(self, channel: str, plan: List[Dict], bucket: str = "week") -> int:
+        """
+        Add one task per planned video, each with its own comment limit (see crawl_planner.plan_crawl).
+        Videos already queued for this channel are left untouched.
+
+        Args:
+            channel: Channel identifier the videos belong to
+            plan: List of {'id', 'max_comments'} dictionaries
+            bucket: Time bucket size of the partial scores ("day", "week" or "month")
+
+        Returns:
+            Number of newly added tasks
+        """
+        with self._transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tasks (channel, video_id, max_comments, bucket) VALUES (?, ?, ?, ?)",
+                [(channel, entry['id'], entry['max_comments'], bucket) for entry in plan]
+            )
+            added = self.conn.total_changes - before
+        logger.info(f"Queued {added} new videos for channel {channel} ({len(plan) - added} already queued)")
+        return added
+
+    def crawled_videos(self, channel: str) -> List[str]:
+        """IDs of the channel's videos that have already been crawled."""
+        rows = self.conn.execute("SELECT video_id FROM tasks WHERE channel = ? AND status = 'done'", (channel,))
+        return [row['video_id'] for row in rows]
+
+    def lease(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict]:
+        """
+        Take the next pending task, or a task whose lease has expired.
+
+        Args:
+            worker: Unique name of the leasing worker
+            lease_seconds: How long the worker owns the task
+
+        Returns:
+            Task dictionary, or None if no task is available right now
+        """
+        now = time.time()
+        with self._transaction():
+            # Tasks whose lease ran out too often are given up on
+            self.conn.execute(
+                "UPDATE tasks SET status = 'failed', worker = NULL "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            row = self.conn.execute(
+                "SELECT * FROM tasks WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ?) ORDER BY attempts, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker, now + lease_seconds, row['id'])
+            )
+        task = dict(row)
+        task.update(status='leased', worker=worker, lease_expires=now + lease_seconds,
+                    attempts=row['attempts'] + 1)
+        return task
+
+    def extend_lease(self, task_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Renew a lease held by worker. Returns False if the lease was lost to another worker."""
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_seconds, task_id, worker)
+        )
+        return cursor.rowcount == 1
+
+    def ack(self, task_id: int, worker: str, result: GroupedVaderScores) -> bool:
+        """
+        Mark a leased task as done and store its partial scores.
+
+        Returns:
+            False if the lease was lost to another worker, in which case the result is discarded
+        """
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = 'done', result = ?, lease_expires = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (json.dumps(result.to_dict()), task_id, worker)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, task_id: int, worker: str):
+        """Hand a leased task back, e.g. after an error. It is marked failed once out of attempts."""
+        self.conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_expires = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (self.max_attempts, task_id, worker)
+        )
+
+    def requeue_failed(self, channel: Optional[str] = None) -> int:
+        """
+        Put failed tasks back in the queue with a fresh set of attempts.
+
+        Args:
+            channel: Only requeue the failed tasks of this channel
+
+        Returns:
+            Number of requeued tasks
+        """
+        if channel is None:
+            cursor = self.conn.execute("UPDATE tasks SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+        else:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0 WHERE status = 'failed' AND channel = ?", (channel,)
+            )
+        logger.info(f"Requeued {cursor.rowcount} failed videos")
+        return cursor.rowcount
+
+    def progress(self, channel: Optional[str] = None) -> Dict[str, int]:
+        """Number of tasks per status, optionally for a single channel."""
+        if channel is None:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status")
+        else:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks WHERE channel = ? GROUP BY status", (channel,))
+        return {status: count for status, count in rows}
+
+    def reduce(self, channel: str) -> Optional[GroupedVaderScores]:
+        """
+        Merge the partial scores of every finished video of a channel.
+
+        Returns:
+            Merged scores, or None if no video of the channel has finished yet
+        """
+        merged = None
+        for row in self.conn.execute("SELECT result FROM tasks WHERE channel = ? AND status = 'done'", (channel,)):
+            partial = GroupedVaderScores.from_dict(json.loads(row['result']))
+            if merged is None:
+                merged = partial
+            else:
+                merged.merge(partial)
+        return merged
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't lease the same task
+        return _Transaction(self.conn)
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def score_video(fetcher, video_id: str, max_comments: int, bucket: str = "week") -> GroupedVaderScores:
+    """
+    Fetch and score one video's comments into a partial GroupedVaderScores.
+
+    API errors such as an exhausted quota are raised rather than producing a truncated partial,
+    so the task is released and retried instead of being acknowledged as done.
+    """
+    from comment_analysis import get_polarity_scores
+
+    scores = GroupedVaderScores(bucket=bucket)
+    for comment in fetcher.get_comments(video_id, max_comments=max_comments, raise_errors=True):
+        score = get_polarity_scores(comment['text'])
+        scores.add_score(score, comment['like_count'], video_id, comment['published_at'])
+    return scores
+
+
+def _work_loop(queue_path: str, worker: str, fetcher, lease_seconds: float, poll_interval: float) -> int:
+    """Lease, crawl and acknowledge tasks until none are left. Returns the number of completed tasks."""
+    queue = CrawlQueue(queue_path)
+    completed = 0
+    consecutive_errors = 0
+    try:
+        while consecutive_errors < MAX_CONSECUTIVE_ERRORS:
+            task = queue.lease(worker, lease_seconds)
+            if task is None:
+                if queue.progress().get('leased', 0) == 0:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f"Worker {worker} crawling video {task['video_id']} of {task['channel']} (attempt {task['attempts']})")
+            try:
+                scores = score_video(fetcher, task['video_id'], task['max_comments'], task['bucket'])
+            except Exception as e:
+                logger.error(f"Error crawling video {task['video_id']}: {e}")
+                queue.release(task['id'], worker)
+                consecutive_errors += 1
+                if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                    logger.error(f"Worker {worker} stopping after {consecutive_errors} failed videos in a row")
+                continue
+            consecutive_errors = 0
+
+            if queue.ack(task['id'], worker, scores):
+                completed += 1
+            else:
+                logger.warning(f"Lease on video {task['video_id']} expired before it finished; result discarded")
+    finally:
+        queue.close()
+    return completed
+
+
+def run_worker(queue_path: str, worker: Optional[str] = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+               poll_interval: float = 5.0, threads: int = 1) -> int:
+    """
+    Lease, crawl and acknowledge tasks until the queue has nothing left to do.
+
+    While other workers still hold leases the worker keeps polling, so it can take over
+    their tasks should they crash.
+
+    Args:
+        queue_path: Path of the SQLite queue file
+        worker: Unique worker name (defaults to hostname:pid)
+        lease_seconds: How long the worker owns each task
+        poll_interval: Seconds to wait between polls while other workers hold leases
+        threads: Number of videos crawled concurrently. The threads share one fetcher
+            whose requests run on a connection pool of the same size
+
+    Returns:
+        Number of tasks this worker completed
+    """
+    try:
+        from config import YOUTUBE_API_KEY
+    except ImportError:
+        logger.error("Error: YOUTUBE_API_KEY not found in config.py")
+        sys.exit(1)
+    from youtube_comments import YouTubeCommentsFetcher
+    from http_pool import HttpPool
+
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    http_pool = HttpPool(max_size=threads) if threads > 1 else None
+    fetcher = YouTubeCommentsFetcher(api_key=YOUTUBE_API_KEY, http_pool=http_pool)
+
+    logger.info(f"Worker {worker} started on queue {queue_path} with {threads} thread(s)")
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [executor.submit(_work_loop, queue_path, f"{worker}/{i}", fetcher, lease_seconds, poll_interval)
+                       for i in range(threads)]
+            completed = sum(future.result() for future in futures)
+        http_pool.close()
+    else:
+        completed = _work_loop(queue_path, worker, fetcher, lease_seconds, poll_interval)
+
+    logger.info(f"Worker {worker} finished after completing {completed} videos")
+    return completed
+
+
+def main():
+    from crawl_planner import POLICIES, plan_crawl
+
+    parser = argparse.ArgumentParser(description="Crawl a YouTube channel through a shared work queue")
+    parser.add_argument('--queue', default='crawl.db', help="Path of the SQLite queue file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = commands.add_parser('enqueue', help="Queue every video of a channel")
+    enqueue_parser.add_argument('channel', help="Channel ID, username, or URL")
+    enqueue_parser.add_argument('--max-vids', type=int, default=50)
+    enqueue_parser.add_argument('--max-comments', type=int, default=1000)
+    enqueue_parser.add_argument('--bucket', default='week', choices=('day', 'week', 'month'))
+    enqueue_parser.add_argument('--comment-budget', type=int,
+                                help="Spread this many comments across the videos instead of --max-comments each")
+    enqueue_parser.add_argument('--policy', default='proportional', choices=POLICIES,
+                                help="How --comment-budget is spread (see crawl_planner.py)")
+
+    work_parser = commands.add_parser('work', help="Crawl queued videos until none are left")
+    work_parser.add_argument('--worker', help="Unique worker name (defaults to hostname:pid)")
+    work_parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS)
+    work_parser.add_argument('--threads', type=int, default=1, help="Number of videos crawled concurrently")
+
+    requeue_parser = commands.add_parser('requeue', help="Retry videos that ran out of attempts")
+    requeue_parser.add_argument('channel', nargs='?', help="Channel identifier as passed to enqueue (defaults to all)")
+
+    reduce_parser = commands.add_parser('reduce', help="Merge the finished videos of a channel")
+    reduce_parser.add_argument('channel', help="Channel identifier as passed to enqueue")
+
+    args = parser.parse_args()
+
+    if args.command == 'enqueue':
+        from channel_videos import YouTubeChannelVideoFetcher
+        from metadata_cache import MetadataCache, DEFAULT_PATH
+        try:
+            from config import YOUTUBE_API_KEY
+        except ImportError:
+            logger.error("Error: YOUTUBE_API_KEY not found in config.py")
+            sys.exit(1)
+
+        metadata_cache = MetadataCache(DEFAULT_PATH)
+        fetcher = YouTubeChannelVideoFetcher(api_key=YOUTUBE_API_KEY, metadata_cache=metadata_cache)
+        channel_id = fetcher.get_channel_id_from_username(args.channel)
+        if not channel_id:
+            logger.error(f"Error: Could not find channel with identifier: {args.channel}")
+            sys.exit(1)
+        video_ids = fetcher.get_all_video_ids(channel_id)[:args.max_vids]
+
+        queue = CrawlQueue(args.queue)
+        if args.comment_budget is None:
+            queue.enqueue(args.channel, video_ids, args.max_comments, args.bucket)
+        else:
+            # Videos finished in earlier runs are left out, so the budget goes to new ones
+            plan = plan_crawl(fetcher.get_video_details(video_ids), comment_budget=args.comment_budget,
+                              policy=args.policy, cap=args.max_comments,
+                              crawled=queue.crawled_videos(args.channel))
+            queue.enqueue_plan(args.channel, plan, args.bucket)
+        queue.close()
+        metadata_cache.close()
+    elif args.command == 'work':
+        run_worker(args.queue, args.worker, args.lease_seconds, threads=args.threads)
+    elif args.command == 'requeue':
+        queue = CrawlQueue(args.queue)
+        queue.requeue_failed(args.channel)
+        queue.close()
+    elif args.command == 'reduce':
+        queue = CrawlQueue(args.queue)
+        logger.info(f"Task status for {args.channel}: {queue.progress(args.channel)}")
+        scores = queue.reduce(args.channel)
+        queue.close()
+        if scores is None:
+            logger.warning(f"No finished videos for channel {args.channel}")
+            return
+        print(f"Channel Kindness: {scores.total.kindness()}")
+        print(f"Channel Volatility: {scores.total.volatility()}")
+
+
+if __name__ == '__main__':
+    from setup_logging import setup_logging
+    logger = setup_logging()
+    main()
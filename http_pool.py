@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+HTTP Connection Pool
+
+httplib2.Http objects (which googleapiclient uses for every request) are not
+thread-safe, so a `youtube` resource can't be shared between threads as long as all
+its requests go through the one Http object that `build()` creates. HttpPool hands
+out Http objects from a bounded pool instead, one per in-flight request. Each Http
+keeps its keep-alive TLS connection open between requests, so threads reuse warm
+connections rather than reconnecting or queueing behind a lock.
+
+Requirements:
+- httplib2 library (installed with google-api-python-client)
+"""
+
+import queue
+import threading
+import logging
+from contextlib import contextmanager
+import httplib2
+
+# Module-level logger
+logger = logging.getLogger(__name__)
+
+# Maximum number of simultaneous connections per pool
+DEFAULT_POOL_SIZE = 8
+
+# Socket timeout of pooled connections (seconds)
+DEFAULT_TIMEOUT = 60
+
+
+class HttpPool:
+    """A bounded, thread-safe pool of httplib2.Http objects."""
+
+    def __init__(self, max_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Initialize an empty pool. Http objects are created on demand, up to max_size.
+
+        Args:
+            max_size: Maximum number of Http objects (and thus concurrent requests)
+            timeout: Socket timeout of each Http object in seconds
+        """
+        self.max_size = max_size
+        self.timeout = timeout
+        # LIFO, so the most recently used (warmest) connection is handed out first
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow an Http object for the duration of a with block, blocking while the pool is exhausted.
+
+        An Http object whose request raised is closed and dropped rather than returned, so a
+        half-finished connection is never reused.
+        """
+        self._slots.acquire()
+        try:
+            try:
+                http = self._idle.get_nowait()
+            except queue.Empty:
+                http = httplib2.Http(timeout=self.timeout)
+            try:
+                yield http
+            except Exception:
+                http.close()
+                raise
+            self._idle.put(http)
+        finally:
+            self._slots.release()
+
+    def execute(self, request, **kwargs):
+        """
+        Execute a googleapiclient request on a pooled connection.
+
+        Args:
+            request: googleapiclient.http.HttpRequest, e.g. from youtube.videos().list(...)
+            **kwargs: Passed on to request.execute (e.g. num_retries)
+
+        Returns:
+            Deserialized response of the request
+        """
+        with self.connection() as http:
+            return request.execute(http=http, **kwargs)
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -6,37 +6,121 @@ run Vader analysis on the comments and then calculate some stats
 import logging
 import sys
 from datetime import datetime
-from channel_videos import get_channel_videos
-from youtube_comments import get_video_comments
+from channel_videos import YouTubeChannelVideoFetcher
+from youtube_comments import YouTubeCommentsFetcher
 from comment_analysis import get_polarity_scores
-from vaderscores import VaderScores
+from vaderscores import GroupedVaderScores
+from comment_export import ParquetCommentWriter
+from score_archive import ScoreArchive
+from crawl_planner import plan_crawl
+from metadata_cache import MetadataCache, DEFAULT_PATH as DEFAULT_METADATA_CACHE_PATH
 from setup_logging import setup_logging
 
-def rate_channel_by_comments(channel_id: str, max_comments_per_vid = 100, max_vids = 50):
+def score_channel(channel_identifier: str, video_fetcher: YouTubeChannelVideoFetcher,
+                  comments_fetcher: YouTubeCommentsFetcher, max_vids = 50, max_comments = 1000, bucket = "week",
+                  export_path = None, archive_path = None, comment_budget = None, policy = "proportional"
+                  ) -> GroupedVaderScores:
   """
-  First, see if Channels / ChannelName exists. If it doesn't, create the appropriate folder
-  In this folder, we'll dump all of the comments together with their scores
+  Fetch and score the comments of a channel's first max_vids videos, using the given (possibly long-lived) fetchers.
+
+  Scores are grouped per video and per `bucket` ("day", "week" or "month") of comment publish time
+  alongside the channel totals, all in the same pass.
+
+  If export_path is given, every comment is also written to that Parquet file together with its scores.
+  If archive_path is given, the scores of comments not archived yet are appended to that score archive, from
+  which the channel metrics can later be recomputed under a different weighting (see score_archive.py).
+
+  If comment_budget is given, that many comments in total are spread across the max_vids videos according
+  to the planner policy (see crawl_planner.py), with max_comments as the per-video cap. Otherwise every
+  video gets up to max_comments comments.
+
+  Raises ValueError if the channel can't be found.
   """
   logger = logging.getLogger(__name__)
-  logger.info(f"Starting analysis for channel: {channel_id}")
-  videos = get_channel_videos(channel_id)
-  logger.info(f"Found {len(videos)} videos for channel {channel_id}")
+  channel_id = video_fetcher.get_channel_id_from_username(channel_identifier)
+  if not channel_id:
+    raise ValueError(f"Could not find channel with identifier: {channel_identifier}")
+  videos = video_fetcher.get_all_video_ids(channel_id)
+  logger.info(f"Found {len(videos)} videos for channel {channel_identifier}")
 
-  scores = VaderScores()
+  scores = GroupedVaderScores(bucket=bucket)
 
   # Limit to max_vids videos
-  for video_id in videos[:max_vids]:
-    comments = get_video_comments(video_id, max_comments=1000)
-    if comments:
+  if comment_budget is None:
+    plan = [(video_id, max_comments) for video_id in videos[:max_vids]]
+  else:
+    video_details = video_fetcher.get_video_details(videos[:max_vids])
+    plan = [(entry['id'], entry['max_comments'])
+            for entry in plan_crawl(video_details, comment_budget=comment_budget, policy=policy, cap=max_comments)]
+
+  exporter = ParquetCommentWriter(export_path) if export_path else None
+  archive = None
+  try:
+    archive = ScoreArchive(archive_path) if archive_path else None
+    for video_id, video_max_comments in plan:
+      comments = comments_fetcher.get_comments(video_id, max_comments=video_max_comments)
+      if not comments:
+        logger.warning(f"No comments were retrieved on video {video_id}.")
       for comment in comments:
-      # for comment in comments[:max_comments_per_vid]:
         score = get_polarity_scores(comment['text'])
         like_count = comment['like_count']
-        scores.add_score(score, like_count)
+        scores.add_score(score, like_count, video_id, comment['published_at'])
+        if exporter:
+          exporter.add_comment(comment, score, video_id, channel_id)
+        if archive:
+          archive.add_score(score, like_count, comment['published_at'], comment['id'])
+  finally:
+    # Close the writers even if the crawl fails, so what was fetched so far stays readable
+    if exporter:
+      exporter.close()
+    if archive:
+      archive.close()
+
+  return scores
+
+
+def rate_channel_by_comments(channel_id: str, max_comments_per_vid = 100, max_vids = 50, bucket = "week", trend_window = 4,
+                             export_path = None, archive_path = None, metadata_cache_path = DEFAULT_METADATA_CACHE_PATH,
+                             comment_budget = None, policy = "proportional"):
+  """
+  First, see if Channels / ChannelName exists. If it doesn't, create the appropriate folder
+  In this folder, we'll dump all of the comments together with their scores
+
+  Alongside the channel totals, scores are grouped per video and per `bucket` ("day", "week" or "month")
+  of comment publish time in the same pass. The grouped scores are returned for drill-down.
+  See score_channel for export_path, archive_path, comment_budget and policy. Channel and video metadata is cached in
+  metadata_cache_path between runs (pass None to keep it in memory only).
+  """
+  logger = logging.getLogger(__name__)
+  logger.info(f"Starting analysis for channel: {channel_id}")
+  try:
+    from config import YOUTUBE_API_KEY
+  except ImportError:
+    logger.error("Error: YOUTUBE_API_KEY not found in config.py")
+    sys.exit(1)
+
+  metadata_cache = MetadataCache(metadata_cache_path)
+  video_fetcher = YouTubeChannelVideoFetcher(api_key=YOUTUBE_API_KEY, metadata_cache=metadata_cache)
+  comments_fetcher = YouTubeCommentsFetcher(api_key=YOUTUBE_API_KEY, metadata_cache=metadata_cache)
+  try:
+    scores = score_channel(channel_id, video_fetcher, comments_fetcher, max_vids=max_vids, max_comments=1000,
+                           bucket=bucket, export_path=export_path, archive_path=archive_path,
+                           comment_budget=comment_budget, policy=policy)
+  except ValueError as e:
+    logger.error(f"Error: {e}")
+    sys.exit(1)
+  finally:
+    metadata_cache.close()
+
+  print(f"Channel Kindness: {scores.total.kindness()}")
+  print(f"Channel Volatility: {scores.total.volatility()}")
 
-  print(f"Channel Kindness: {scores.kindness()}")
-  print(f"Channel Volatility: {scores.volatility()}")
+  for video_id, summary in scores.video_breakdown().items():
+    logger.info(f"  Video {video_id}: {summary}")
+  for point in scores.rolling_trend(window=trend_window):
+    logger.info(f"  Trend ({trend_window} {bucket}s to {point['bucket']}): {point}")
 
+  return scores
 
 if __name__ == '__main__':
   logger = setup_logging()
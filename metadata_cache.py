@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Metadata Cache
+
+A TTL cache for the channel and video metadata the fetchers look up, so repeated
+runs spend their API quota on comments rather than on lookups. Entries live in an
+in-memory LRU and, optionally, in a SQLite file that persists between runs.
+
+Every kind of entry has its own time-to-live: handle-to-ID mappings and titles
+hardly ever change, while view and comment counts go stale quickly. Lookups that
+found nothing (e.g. an unknown handle) are cached too, for a shorter time.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Module-level logger
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+# Time-to-live of each kind of entry (seconds)
+DEFAULT_TTLS = {
+    'channel_id': 30 * DAY,          # Channel ID of a handle, username or URL
+    'channel_snippet': 7 * DAY,      # Channel title, description, ...
+    'channel_statistics': 60 * 60,   # Subscriber, video and view counts
+    'video_snippet': 7 * DAY,        # Video title, description, publish time, ...
+    'video_statistics': 60 * 60,     # View, like and comment counts
+}
+
+# Time-to-live of lookups that found nothing (seconds)
+DEFAULT_NEGATIVE_TTL = DAY
+
+# Default location of the persistent cache
+DEFAULT_PATH = os.path.join('cache', 'metadata.db')
+
+# Maximum number of entries kept in memory
+DEFAULT_MAX_ENTRIES = 4096
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+)
+"""
+
+
+class MetadataCache:
+    """A thread-safe TTL cache with an in-memory LRU and optional on-disk persistence."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttls: Optional[Dict[str, float]] = None, negative_ttl: float = DEFAULT_NEGATIVE_TTL):
+        """
+        Open a metadata cache.
+
+        Args:
+            path: SQLite file to persist entries in, or None to keep them in memory only
+            max_entries: Maximum number of entries kept in memory
+            ttls: Time-to-live overrides per kind of entry (see DEFAULT_TTLS)
+            negative_ttl: Time-to-live of lookups that found nothing
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.negative_ttl = negative_ttl
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute(_SCHEMA)
+            self._conn.execute("DELETE FROM metadata WHERE expires <= ?", (time.time(),))
+
+    def get(self, kind: str, key: str) -> Tuple[bool, Any]:
+        """
+        Look up an entry.
+
+        Returns:
+            (hit, value) tuple. A hit with value None means the lookup is known to find nothing
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((kind, key))
+            if entry is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, expires FROM metadata WHERE kind = ? AND key = ?", (kind, key)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[1], json.loads(row[0]))
+                    self._remember((kind, key), entry)
+            if entry is None:
+                return False, None
+            if entry[0] <= now:
+                del self._memory[(kind, key)]
+                return False, None
+            self._memory.move_to_end((kind, key))
+            return True, entry[1]
+
+    def set(self, kind: str, key: str, value: Any):
+        """
+        Store an entry for the time-to-live of its kind. Storing None records that the lookup found nothing.
+
+        Args:
+            kind: Kind of entry (a key of DEFAULT_TTLS)
+            key: Lookup key, e.g. a channel or video ID
+            value: JSON-serializable value, or None
+        """
+        ttl = self.negative_ttl if value is None else self.ttls[kind]
+        entry = (time.time() + ttl, value)
+        with self._lock:
+            self._remember((kind, key), entry)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO metadata (kind, key, value, expires) VALUES (?, ?, ?, ?)",
+                    (kind, key, json.dumps(value), entry[0])
+                )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _remember(self, cache_key: Tuple[str, str], entry: Tuple[float, Any]):
+        self._memory[cache_key] = entry
+        self._memory.move_to_end(cache_key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+def video_snippet(video: Dict) -> Dict:
+    """Extract the cached (slow-changing) snippet fields of a videos().list item."""
+    snippet = video['snippet']
+    return {
+        'title': snippet['title'],
+        'description': snippet['description'],
+        'channel_title': snippet['channelTitle'],
+        'published_at': snippet['publishedAt'],
+        'duration': snippet.get('duration', ''),
+        'thumbnail_url': snippet['thumbnails'].get('default', {}).get('url', '')
+    }
+
+
+def video_statistics(video: Dict) -> Dict:
+    """Extract the cached (fast-changing) statistics fields of a videos().list item."""
+    statistics = video['statistics']
+    return {
+        'view_count': statistics.get('viewCount', 0),
+        'like_count': statistics.get('likeCount', 0),
+        'comment_count': statistics.get('commentCount', 0)
+    }
+
+
+def channel_snippet(channel: Dict) -> Dict:
+    """Extract the cached (slow-changing) snippet fields of a channels().list item."""
+    snippet = channel['snippet']
+    return {
+        'title': snippet['title'],
+        'description': snippet['description'],
+        'custom_url': snippet.get('customUrl'),
+        'published_at': snippet['publishedAt']
+    }
+
+
+def channel_statistics(channel: Dict) -> Dict:
+    """Extract the cached (fast-changing) statistics fields of a channels().list item."""
+    statistics = channel['statistics']
+    return {
+        'subscriber_count': statistics.get('subscriberCount', 0),
+        'video_count': statistics.get('videoCount', 0),
+        'view_count': statistics.get('viewCount', 0)
+    }
+
+
+if __name__ == '__main__':
+    """Unit test: entries expire, and negative entries are hits with value None"""
+    cache = MetadataCache(max_entries=2, ttls={'channel_statistics': -1})
+    cache.set('channel_id', '@someone', 'UC123')
+    cache.set('channel_id', '@nobody', None)
+    cache.set('channel_statistics', 'UC123', {'view_count': 1})
+    print(f"@someone: {cache.get('channel_id', '@someone')}")  # Evicted by LRU -> (False, None)
+    print(f"@nobody: {cache.get('channel_id', '@nobody')}")    # Negative hit -> (True, None)
+    print(f"UC123 statistics: {cache.get('channel_statistics', 'UC123')}")  # Expired -> (False, None)
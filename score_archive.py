@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Score Archive
+
+A compact binary archive of a channel's comment scores: one fixed-width record per
+comment holding float32 pos/neu/neg/compound scores, the like count and the publish
+time. Records are appended during a crawl and read back through numpy.memmap, so
+channel metrics can be recomputed with a different weighting without refetching or
+rescoring any comments, in flat memory however large the archive is.
+
+Every record also carries a 64-bit hash of its comment ID, and comments that are
+already in the archive are skipped, so crawling a channel again only adds the comments
+that are new since the last crawl instead of counting the old ones twice. An archived
+comment keeps the like count it had when it was first archived. While appending, the
+keys are held in one sorted array of 8 bytes per archived comment.
+
+Requirements:
+- numpy library
+
+Usage:
+    python score_archive.py archives/CHANNEL.scores --weighting log
+"""
+
+import argparse
+import hashlib
+import os
+import logging
+from typing import Callable, Dict, Optional
+from vaderscores import ScoreAggregate, like_weight, parse_published_at
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Module-level logger
+logger = logging.getLogger(__name__)
+
+# Every archive starts with this 16 byte header (magic + format version, zero padded)
+HEADER = b"CTSCORE2".ljust(16, b"\0")
+
+# Layout of one archived comment (little-endian, packed)
+RECORD_FIELDS = [
+    ('comment_key', '<u8'),  # Hash of the comment ID (see comment_key)
+    ('pos', '<f4'),
+    ('neu', '<f4'),
+    ('neg', '<f4'),
+    ('compound', '<f4'),
+    ('like_count', '<u4'),
+    ('timestamp', '<i8'),  # Publish time in seconds since the epoch
+]
+RECORD_DTYPE = np.dtype(RECORD_FIELDS) if np is not None else None
+
+# Records buffered in memory before being appended to the file
+DEFAULT_BUFFER_SIZE = 10_000
+
+# Records processed per step when recomputing metrics
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def log_like_weight(likes):
+    """Weight comments by 1 + ln(1 + likes), so a handful of viral comments don't dominate"""
+    return 1 + np.log1p(likes)
+
+
+def uniform_weight(likes):
+    """Weight every comment equally, ignoring likes"""
+    return np.ones(np.shape(likes))
+
+
+# Weighting functions selectable by name. Each maps an array of like counts to an array of weights
+WEIGHTINGS: Dict[str, Callable] = {
+    'likes': like_weight,
+    'log': log_like_weight,
+    'uniform': uniform_weight,
+}
+
+
+def comment_key(comment_id: str) -> int:
+    """64-bit key of a comment ID, used to recognise comments that are already archived"""
+    return int.from_bytes(hashlib.blake2b(comment_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def archive_path(channel_id: str, directory: str = 'archives') -> str:
+    """Default archive location for a channel"""
+    return os.path.join(directory, f"{channel_id}.scores")
+
+
+class ScoreArchive:
+    """Appends comment scores to a binary archive and recomputes metrics from it."""
+
+    def __init__(self, filename: str, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """
+        Open a score archive, creating it if it doesn't exist yet.
+
+        Args:
+            filename: Archive filename
+            buffer_size: Number of records buffered before they are appended to the file
+        """
+        if np is None:
+            raise ImportError("Score archives require numpy (pip install numpy)")
+
+        self.filename = filename
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._archived_keys = None  # Sorted keys of the records in the file, loaded on the first add_score
+        self._buffered_keys = set()  # Keys of the buffered records
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            with open(filename, 'wb') as f:
+                f.write(HEADER)
+        else:
+            with open(filename, 'rb') as f:
+                header = f.read(len(HEADER))
+                if header != HEADER:
+                    if header.startswith(b"CTSCORE"):
+                        raise ValueError(f"{filename} is a score archive of an older format; delete it and crawl again")
+                    raise ValueError(f"{filename} is not a score archive")
+
+    def add_score(self, score: Dict, likes: int, published_at: str, comment_id: str) -> bool:
+        """
+        Buffer one comment's scores for appending, unless the comment is already archived.
+
+        Args:
+            score: Vader polarity scores of the comment
+            likes: Number of times the comment has been liked
+            published_at: Publish time of the comment as returned by the API
+            comment_id: YouTube comment ID
+
+        Returns:
+            True if the comment was added, False if it was already archived
+        """
+        key = comment_key(comment_id)
+        if self._archived_keys is None:
+            records = self.records()
+            self._archived_keys = np.sort(records['comment_key']) if records is not None else np.empty(0, '<u8')
+        position = np.searchsorted(self._archived_keys, key)
+        if key in self._buffered_keys or (position < len(self._archived_keys) and self._archived_keys[position] == key):
+            return False
+        self._buffered_keys.add(key)
+
+        self._buffer.append((key, score['pos'], score['neu'], score['neg'], score.get('compound', 0.0),
+                             likes, int(parse_published_at(published_at).timestamp())))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Append any buffered records to the file."""
+        if not self._buffer:
+            return
+        records = np.array(self._buffer, dtype=RECORD_DTYPE)
+        with open(self.filename, 'ab') as f:
+            f.write(records.tobytes())
+        self._buffer = []
+        # Fold the appended keys into the sorted array, so only the buffer's keys live in a set
+        if self._archived_keys is not None:
+            keys = np.sort(records['comment_key'])
+            self._archived_keys = np.insert(self._archived_keys, np.searchsorted(self._archived_keys, keys), keys)
+        self._buffered_keys.clear()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        """Number of records in the file (not counting buffered ones)"""
+        return (os.path.getsize(self.filename) - len(HEADER)) // RECORD_DTYPE.itemsize
+
+    def records(self) -> Optional["np.memmap"]:
+        """
+        Memory-map the archived records read-only.
+
+        Returns:
+            Structured array with one record per comment, or None if the archive is empty
+        """
+        count = len(self)
+        if count == 0:
+            return None
+        return np.memmap(self.filename, dtype=RECORD_DTYPE, mode='r', offset=len(HEADER), shape=(count,))
+
+    def aggregate(self, weight_fn: Callable = like_weight, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ScoreAggregate:
+        """
+        Recompute the weighted score sums of every archived comment.
+
+        Args:
+            weight_fn: Maps an array of like counts to an array of weights
+            chunk_size: Number of records processed per step
+
+        Returns:
+            ScoreAggregate whose kindness() and volatility() are the channel metrics under weight_fn
+        """
+        self.flush()
+        agg = ScoreAggregate()
+        records = self.records()
+        if records is None:
+            return agg
+
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            weights = np.asarray(weight_fn(chunk['like_count'].astype(np.float64)), dtype=np.float64)
+            agg.merge(ScoreAggregate(
+                count=len(chunk),
+                weight=float(weights.sum()),
+                pos=float(np.dot(chunk['pos'], weights)),
+                neu=float(np.dot(chunk['neu'], weights)),
+                neg=float(np.dot(chunk['neg'], weights)),
+            ))
+        return agg
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute channel metrics from a score archive")
+    parser.add_argument('archive', help="Path of the score archive")
+    parser.add_argument('--weighting', default='likes', choices=sorted(WEIGHTINGS))
+    args = parser.parse_args()
+
+    archive = ScoreArchive(args.archive)
+    agg = archive.aggregate(WEIGHTINGS[args.weighting])
+    print(f"Comments: {agg.count}")
+    print(f"Channel Kindness: {agg.kindness()}")
+    print(f"Channel Volatility: {agg.volatility()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+CommenTone Analysis Service
+
+A small local HTTP server that answers channel rating requests without paying for
+Python startup, API client construction and VADER lexicon loading on every query.
+The analyzer and the API fetchers (sharing one connection pool) stay warm for the
+lifetime of the process, results are cached for a configurable time, and concurrent
+requests for the same channel wait on a single crawl rather than starting their own.
+
+Usage:
+    python service.py --port 8765 --cache-ttl 3600
+    curl "http://127.0.0.1:8765/channel?id=@channelname&max_vids=3"
+"""
+
+import argparse
+import json
+import sys
+import time
+import threading
+import logging
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from channel_videos import YouTubeChannelVideoFetcher
+from youtube_comments import YouTubeCommentsFetcher
+from http_pool import HttpPool
+from metadata_cache import MetadataCache, DEFAULT_PATH as DEFAULT_METADATA_CACHE_PATH
+from vaderscores import BUCKET_SIZES
+from main import score_channel
+
+# Module-level logger
+logger = logging.getLogger(__name__)
+
+# How long a channel's result is served from cache (seconds)
+DEFAULT_CACHE_TTL = 3600
+
+# Maximum number of simultaneous API connections
+DEFAULT_POOL_SIZE = 8
+
+
+class AnalysisService:
+    """Rates channels on demand with warm fetchers, a TTL result cache and request coalescing."""
+
+    def __init__(self, api_key: str, cache_ttl: float = DEFAULT_CACHE_TTL, pool_size: int = DEFAULT_POOL_SIZE,
+                 metadata_cache_path: Optional[str] = DEFAULT_METADATA_CACHE_PATH):
+        """
+        Initialize the service.
+
+        Args:
+            api_key: YouTube Data API key
+            cache_ttl: Seconds a result is served from cache
+            pool_size: Maximum number of simultaneous API connections
+            metadata_cache_path: SQLite file persisting channel and video metadata, or None for memory only
+        """
+        self.cache_ttl = cache_ttl
+        self.http_pool = HttpPool(max_size=pool_size)
+        self.metadata_cache = MetadataCache(metadata_cache_path)
+        self.video_fetcher = YouTubeChannelVideoFetcher(api_key=api_key, http_pool=self.http_pool,
+                                                        metadata_cache=self.metadata_cache)
+        self.comments_fetcher = YouTubeCommentsFetcher(api_key=api_key, http_pool=self.http_pool,
+                                                       metadata_cache=self.metadata_cache)
+        self._cache: Dict[Tuple, Tuple[float, Dict]] = {}  # key -> (expiry time, result)
+        self._in_flight: Dict[Tuple, Future] = {}  # key -> crawl in progress
+        self._lock = threading.Lock()
+
+    def rate_channel(self, channel: str, max_vids: int = 50, bucket: str = "week") -> Dict:
+        """
+        Rate a channel, from cache if possible.
+
+        If another request is already crawling the same channel with the same settings,
+        this waits for that crawl instead of starting a second one.
+
+        Args:
+            channel: Channel ID, username, or URL
+            max_vids: Number of most recent videos to score
+            bucket: Time bucket size of the trend ("day", "week" or "month")
+
+        Returns:
+            Dictionary with the channel's kindness and volatility, per-video breakdown and trend
+
+        Raises:
+            ValueError: If the channel can't be found
+        """
+        key = (channel, max_vids, bucket)
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                return dict(cached[1], cached=True)
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            logger.info(f"Waiting for crawl of {channel} already in progress")
+            return dict(future.result(), cached=False)
+
+        try:
+            result = self._crawl(channel, max_vids, bucket)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            with self._lock:
+                self._evict_expired(time.time())
+                self._cache[key] = (time.time() + self.cache_ttl, result)
+            return dict(result, cached=False)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _crawl(self, channel: str, max_vids: int, bucket: str) -> Dict:
+        logger.info(f"Crawling channel {channel} (max_vids={max_vids}, bucket={bucket})")
+        scores = score_channel(channel, self.video_fetcher, self.comments_fetcher, max_vids=max_vids, bucket=bucket)
+        return {
+            'channel': channel,
+            'comments': scores.total.count,
+            'kindness': scores.total.kindness(),
+            'volatility': scores.total.volatility(),
+            'videos': scores.video_breakdown(),
+            'trend': scores.rolling_trend(),
+            'computed_at': time.time(),
+        }
+
+    def _evict_expired(self, now: float):
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+        GET /health                                     -> {"status": "ok"}
+        GET /channel?id=CHANNEL[&max_vids=N][&bucket=B] -> channel rating
+    """
+
+    service: AnalysisService = None  # Set by serve()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        if url.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+            return
+        if url.path != '/channel':
+            self._send_json(404, {'error': f"Unknown path {url.path}"})
+            return
+
+        channel = params.get('id')
+        bucket = params.get('bucket', 'week')
+        try:
+            max_vids = int(params.get('max_vids', 50))
+        except ValueError:
+            max_vids = 0
+        if not channel or max_vids < 1 or bucket not in BUCKET_SIZES:
+            self._send_json(400, {'error': f"Expected id, a positive max_vids and a bucket in {BUCKET_SIZES}"})
+            return
+
+        try:
+            result = self.service.rate_channel(channel, max_vids=max_vids, bucket=bucket)
+        except ValueError as e:
+            self._send_json(404, {'error': str(e)})
+        except Exception as e:
+            logger.error(f"Error rating channel {channel}: {e}")
+            self._send_json(500, {'error': str(e)})
+        else:
+            self._send_json(200, result)
+
+    def _send_json(self, status: int, body: Dict):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.info(f"  {self.address_string()} {format % args}")
+
+
+def serve(host: str = '127.0.0.1', port: int = 8765, cache_ttl: float = DEFAULT_CACHE_TTL,
+          pool_size: int = DEFAULT_POOL_SIZE, metadata_cache_path: Optional[str] = DEFAULT_METADATA_CACHE_PATH):
+    """Run the analysis service until interrupted."""
+    try:
+        from config import YOUTUBE_API_KEY
+    except ImportError:
+        logger.error("Error: YOUTUBE_API_KEY not found in config.py")
+        sys.exit(1)
+
+    AnalysisRequestHandler.service = AnalysisService(YOUTUBE_API_KEY, cache_ttl=cache_ttl, pool_size=pool_size,
+                                                   metadata_cache_path=metadata_cache_path)
+    server = ThreadingHTTPServer((host, port), AnalysisRequestHandler)
+    logger.info(f"Analysis service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        AnalysisRequestHandler.service.http_pool.close()
+        AnalysisRequestHandler.service.metadata_cache.close()
+
+
+if __name__ == '__main__':
+    from setup_logging import setup_logging
+    logger = setup_logging()
+
+    parser = argparse.ArgumentParser(description="Serve channel ratings over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_CACHE_TTL, help="Seconds a result is cached")
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help="Maximum simultaneous API connections")
+    parser.add_argument('--metadata-cache', default=DEFAULT_METADATA_CACHE_PATH,
+                        help="SQLite file persisting channel and video metadata")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.cache_ttl, args.pool_size, args.metadata_cache)
@@ -1,18 +1,25 @@
-from typing import Dict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+def like_weight(likes):
+  """Default comment weight: one plus the number of likes. Works on ints and numpy arrays alike"""
+  return likes + 1
+
 
 class VaderScores:
-  def __init__(self):
+  def __init__(self, weight_fn: Callable = like_weight):
     self.pos_scores = []
     self.neu_scores = []
     self.neg_scores = []
     self.weights = [] # Multiplicative weight for the score
+    self.weight_fn = weight_fn # Maps a comment's like count to its weight
   
   def add_score(self, score: Dict, likes: int):
     f"""score is a dict with keys ("pos", "neu", "neg") and likes is the number of times the corresponding comment has been liked"""
     self.pos_scores.append(score['pos'])
     self.neu_scores.append(score['neu'])
     self.neg_scores.append(score['neg'])
-    self.weights.append(likes + 1) # Multiplicative factor
+    self.weights.append(self.weight_fn(likes)) # Multiplicative factor
 
   def average_scores(self):
     avg_pos = sum(self.pos_scores) / len(self.pos_scores)
@@ -64,6 +71,192 @@ class VaderScores:
     return 1/(Z + abs(P-N))
 
 
+class ScoreAggregate:
+  """
+  Running, like-weighted sums of Vader scores.
+
+  Unlike VaderScores this doesn't keep every score around, so two aggregates can be merged.
+  kindness() and volatility() give the same results as VaderScores fed with the same comments.
+  """
+  def __init__(self, count: int = 0, weight: float = 0.0, pos: float = 0.0, neu: float = 0.0, neg: float = 0.0):
+    self.count = count   # Number of comments
+    self.weight = weight # Sum of weights
+    self.pos = pos       # Weighted sum of pos scores
+    self.neu = neu       # Weighted sum of neu scores
+    self.neg = neg       # Weighted sum of neg scores
+
+  def add_score(self, score: Dict, likes: int):
+    """score is a dict with keys ("pos", "neu", "neg") and likes is the number of times the corresponding comment has been liked"""
+    weight = like_weight(likes) # Multiplicative factor
+    self.count += 1
+    self.weight += weight
+    self.pos += score['pos'] * weight
+    self.neu += score['neu'] * weight
+    self.neg += score['neg'] * weight
+
+  def merge(self, other: "ScoreAggregate") -> "ScoreAggregate":
+    """Fold another aggregate into this one (in place) and return self"""
+    self.count += other.count
+    self.weight += other.weight
+    self.pos += other.pos
+    self.neu += other.neu
+    self.neg += other.neg
+    return self
+
+  def weighted_average_scores(self):
+    if self.weight == 0:
+      return {"weighted_avg_pos": 0.0, "weighted_avg_neu": 0.0, "weighted_avg_neg": 0.0}
+    return {"weighted_avg_pos": round(self.pos / self.weight, 3),
+            "weighted_avg_neu": round(self.neu / self.weight, 3),
+            "weighted_avg_neg": round(self.neg / self.weight, 3)}
+
+  def kindness(self):
+    weighted_average_scores = self.weighted_average_scores()
+    P = weighted_average_scores['weighted_avg_pos']
+    N = weighted_average_scores['weighted_avg_neg']
+    if P + N == 0:
+      # Empty group, or nothing but neutral comments
+      return 0.0
+    return ((P-N)/(P+N))
+
+  def volatility(self):
+    weighted_average_scores = self.weighted_average_scores()
+    P = weighted_average_scores['weighted_avg_pos']
+    N = weighted_average_scores['weighted_avg_neg']
+    Z = weighted_average_scores['weighted_avg_neu']
+    if Z + abs(P-N) == 0:
+      return 0.0
+    return 1/(Z + abs(P-N))
+
+  def summary(self) -> Dict:
+    return {"comments": self.count, "kindness": self.kindness(), "volatility": self.volatility()}
+
+  def to_dict(self) -> Dict:
+    return {"count": self.count, "weight": self.weight, "pos": self.pos, "neu": self.neu, "neg": self.neg}
+
+  @classmethod
+  def from_dict(cls, data: Dict) -> "ScoreAggregate":
+    return cls(data["count"], data["weight"], data["pos"], data["neu"], data["neg"])
+
+
+# Granularities accepted by time_bucket
+BUCKET_SIZES = ("day", "week", "month")
+
+def parse_published_at(published_at: str) -> datetime:
+  """Parse an API timestamp such as "2024-03-01T17:04:05Z" """
+  return datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+
+def time_bucket(published_at: str, bucket: str = "week") -> str:
+  """
+  Map an API timestamp to its bucket key: "2024-03-01" (day), "2024-W09" (ISO week) or "2024-03" (month).
+  Keys of the same granularity sort chronologically.
+  """
+  ts = parse_published_at(published_at)
+  if bucket == "day":
+    return ts.strftime("%Y-%m-%d")
+  if bucket == "week":
+    year, week, _ = ts.isocalendar()
+    return f"{year}-W{week:02d}"
+  if bucket == "month":
+    return ts.strftime("%Y-%m")
+  raise ValueError(f"bucket must be one of {BUCKET_SIZES}, got {bucket!r}")
+
+
+def preceding_buckets(key: str, bucket: str, count: int) -> List[str]:
+  """The `count` calendar buckets ending with (and including) bucket key `key`, oldest first"""
+  if bucket == "day":
+    end = date.fromisoformat(key)
+    keys = [(end - timedelta(days=i)).isoformat() for i in range(count)]
+  elif bucket == "week":
+    year, week = key.split("-W")
+    end = date.fromisocalendar(int(year), int(week), 1)
+    keys = []
+    for i in range(count):
+      iso_year, iso_week, _ = (end - timedelta(weeks=i)).isocalendar()
+      keys.append(f"{iso_year}-W{iso_week:02d}")
+  elif bucket == "month":
+    year, month = (int(part) for part in key.split("-"))
+    keys = []
+    for i in range(count):
+      index = year * 12 + (month - 1) - i
+      keys.append(f"{index // 12}-{index % 12 + 1:02d}")
+  else:
+    raise ValueError(f"bucket must be one of {BUCKET_SIZES}, got {bucket!r}")
+  return keys[::-1]
+
+
+class GroupedVaderScores:
+  """
+  Channel-wide, per-video and per-time-bucket aggregates, all fed by one add_score call per comment.
+
+  Every group is a ScoreAggregate, so grouped scores from separate crawls of the same channel can be merged.
+  """
+  def __init__(self, bucket: str = "week"):
+    if bucket not in BUCKET_SIZES:
+      raise ValueError(f"bucket must be one of {BUCKET_SIZES}, got {bucket!r}")
+    self.bucket = bucket
+    self.total = ScoreAggregate()
+    self.by_video: Dict[str, ScoreAggregate] = {}
+    self.by_time: Dict[str, ScoreAggregate] = {}
+
+  def add_score(self, score: Dict, likes: int, video_id: str, published_at: str):
+    """Add a comment's score to the channel total, its video's group and its time bucket"""
+    self.total.add_score(score, likes)
+    self.by_video.setdefault(video_id, ScoreAggregate()).add_score(score, likes)
+    key = time_bucket(published_at, self.bucket)
+    self.by_time.setdefault(key, ScoreAggregate()).add_score(score, likes)
+
+  def merge(self, other: "GroupedVaderScores") -> "GroupedVaderScores":
+    """Fold another set of grouped scores into this one (in place) and return self"""
+    if other.bucket != self.bucket:
+      raise ValueError(f"Can't merge {other.bucket!r} buckets into {self.bucket!r} buckets")
+    self.total.merge(other.total)
+    for video_id, agg in other.by_video.items():
+      self.by_video.setdefault(video_id, ScoreAggregate()).merge(agg)
+    for key, agg in other.by_time.items():
+      self.by_time.setdefault(key, ScoreAggregate()).merge(agg)
+    return self
+
+  def video_breakdown(self) -> Dict[str, Dict]:
+    """Comment count, kindness and volatility for each video"""
+    return {video_id: agg.summary() for video_id, agg in self.by_video.items()}
+
+  def time_breakdown(self) -> Dict[str, Dict]:
+    """Comment count, kindness and volatility for each time bucket, oldest first"""
+    return {key: self.by_time[key].summary() for key in sorted(self.by_time)}
+
+  def rolling_trend(self, window: int = 4) -> List[Dict]:
+    """
+    Kindness and volatility over a sliding window of time buckets, oldest first.
+
+    There is one entry per bucket with comments. Each covers that bucket and the (window - 1) calendar
+    buckets before it, so a 4 week window always spans 4 weeks; weeks without comments count as empty.
+    """
+    if window < 1:
+      raise ValueError("window must be at least 1")
+    trend = []
+    for key in sorted(self.by_time):
+      agg = ScoreAggregate()
+      for prev in preceding_buckets(key, self.bucket, window):
+        if prev in self.by_time:
+          agg.merge(self.by_time[prev])
+      trend.append({"bucket": key, **agg.summary()})
+    return trend
+
+  def to_dict(self) -> Dict:
+    return {"bucket": self.bucket,
+            "total": self.total.to_dict(),
+            "by_video": {k: v.to_dict() for k, v in self.by_video.items()},
+            "by_time": {k: v.to_dict() for k, v in self.by_time.items()}}
+
+  @classmethod
+  def from_dict(cls, data: Dict) -> "GroupedVaderScores":
+    grouped = cls(data["bucket"])
+    grouped.total = ScoreAggregate.from_dict(data["total"])
+    grouped.by_video = {k: ScoreAggregate.from_dict(v) for k, v in data["by_video"].items()}
+    grouped.by_time = {k: ScoreAggregate.from_dict(v) for k, v in data["by_time"].items()}
+    return grouped
+
 
 if __name__ == "__main__":
     print("Running unit test for vaderscores.py")
@@ -80,3 +273,12 @@ if __name__ == "__main__":
     print("VaderScore object initialized without error")
     print(f"Average scores for sample data: {VS.average_scores()}")
     print(f"Weighted average scores for sample data: {VS.weighted_average_scores()}")
+
+    GS = GroupedVaderScores(bucket="day")
+    sample_videos = ["vid_a", "vid_a", "vid_b"]
+    sample_times = ["2024-03-01T10:00:00Z", "2024-03-02T10:00:00Z", "2024-03-02T12:00:00Z"]
+    for score, like_count, video_id, published_at in zip(sample_scores, sample_like_counts, sample_videos, sample_times):
+        GS.add_score(score, like_count, video_id, published_at)
+    assert GS.total.kindness() == VS.kindness()
+    print(f"Per-video breakdown for sample data: {GS.video_breakdown()}")
+    print(f"Rolling trend for sample data: {GS.rolling_trend(window=2)}")
@@ -18,9 +18,11 @@ import json
 import sys
 import time
 import logging
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from http_pool import HttpPool
+from metadata_cache import MetadataCache, video_snippet, video_statistics
 # import os
 
 # Maximum number of comments threads requested per API query
@@ -32,14 +34,19 @@ logger = logging.getLogger(__name__)
 class YouTubeCommentsFetcher:
     """Fetches comments from YouTube videos using the YouTube Data API v3."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, http_pool: Optional[HttpPool] = None,
+                 metadata_cache: Optional[MetadataCache] = None):
         """
         Initialize the YouTubeCommentsFetcher.
         
         Args:
             api_key: YouTube Data API key
+            http_pool: Connection pool to run requests on. Required to share the fetcher between threads
+            metadata_cache: Cache for video info
         """
         self.api_key = api_key
+        self.http_pool = http_pool
+        self.metadata_cache = metadata_cache
         self.youtube = None # Discovery document
         self._initialize_api()
     
@@ -55,6 +62,23 @@ class YouTubeCommentsFetcher:
             logger.error(f" Error initializing YouTube API: {e}")
             sys.exit(1)
     
+    def _execute(self, request) -> Dict:
+        """Execute an API request, on a pooled connection if the fetcher has a pool."""
+        if self.http_pool:
+            return self.http_pool.execute(request)
+        return request.execute()
+    
+    def _cached(self, kind: str, key: str) -> Tuple[bool, Any]:
+        """Look up a metadata cache entry, as a (hit, value) tuple."""
+        if self.metadata_cache is None:
+            return False, None
+        return self.metadata_cache.get(kind, key)
+    
+    def _store(self, kind: str, key: str, value: Any):
+        """Store a metadata cache entry, if the fetcher has a cache."""
+        if self.metadata_cache is not None:
+            self.metadata_cache.set(kind, key, value)
+    
     def get_video_info(self, video_id: str) -> Dict:
         """
         Get basic information about the video.
@@ -65,27 +89,41 @@ class YouTubeCommentsFetcher:
         Returns:
             Dictionary containing video information
         """
-        try:
-            request = self.youtube.videos().list(
-                part='snippet,statistics',
-                id=video_id
-            )
-            response = request.execute()
-            
-            if not response['items']:
-                return None
-            
-            video = response['items'][0]
-            return {
-                'title': video['snippet']['title'],
-                'channel': video['snippet']['channelTitle'],
-                'view_count': video['statistics'].get('viewCount', 0),
-                'like_count': video['statistics'].get('likeCount', 0),
-                'comment_count': video['statistics'].get('commentCount', 0)
-            }
-        except HttpError as e:
-            logger.error(f"Error fetching video info: {e}")
+        snippet_hit, snippet = self._cached('video_snippet', video_id)
+        if snippet_hit and snippet is None:
             return None
+        statistics_hit, statistics = self._cached('video_statistics', video_id)
+
+        if not (snippet_hit and statistics_hit):
+            try:
+                request = self.youtube.videos().list(
+                    # Only refresh the counts if the title etc. are still cached
+                    part='statistics' if snippet_hit else 'snippet,statistics',
+                    id=video_id
+                )
+                response = self._execute(request)
+                
+                if not response['items']:
+                    self._store('video_snippet', video_id, None)
+                    return None
+                
+                video = response['items'][0]
+                if not snippet_hit:
+                    snippet = video_snippet(video)
+                    self._store('video_snippet', video_id, snippet)
+                statistics = video_statistics(video)
+                self._store('video_statistics', video_id, statistics)
+            except HttpError as e:
+                logger.error(f"Error fetching video info: {e}")
+                return None
+
+        return {
+            'title': snippet['title'],
+            'channel': snippet['channel_title'],
+            'view_count': statistics['view_count'],
+            'like_count': statistics['like_count'],
+            'comment_count': statistics['comment_count']
+        }
     
     def get_all_comments(self, video_id: str) -> List[Dict]:
         """
@@ -116,7 +154,7 @@ class YouTubeCommentsFetcher:
                     order='relevance'  # You can change this to 'relevance' or 'time'
                 )
                 
-                response = request.execute()
+                response = self._execute(request)
                 
                 for item in response['items']:
                     comment = self._extract_comment_data(item)
@@ -148,13 +186,16 @@ class YouTubeCommentsFetcher:
         logger.info(f"  Successfully fetched {len(all_comments)} comments")
         return all_comments
     
-    def get_comments(self, video_id: str, max_comments: int) -> List[Dict]:
+    def get_comments(self, video_id: str, max_comments: int, raise_errors: bool = False) -> List[Dict]:
         """
         Fetch comments from a YouTube video up to a specified maximum.
         
         Args:
             video_id: YouTube video ID
             max_comments: Maximum number of comments to fetch
+            raise_errors: Re-raise API errors (quota exceeded, server errors, ...) instead of
+                returning the comments fetched so far. Missing videos and disabled comments
+                still return normally, since retrying won't change them
             
         Returns:
             List of comment dictionaries (up to max_comments)
@@ -182,7 +223,7 @@ class YouTubeCommentsFetcher:
                     order='relevance'  # You can change this to 'relevance' or 'time'
                 )
                 
-                response = request.execute()
+                response = self._execute(request)
                 
                 for item in response['items']:
                     # Stop if we've reached the maximum
@@ -217,12 +258,15 @@ class YouTubeCommentsFetcher:
                 logger.error("  Video not found or comments disabled.")
             else:
                 logger.error(f"  Error fetching comments: {e}")
+            if raise_errors and not _is_permanent_error(e):
+                raise
             return all_comments
         
         logger.info(f"  Successfully fetched {len_all_comments} comments (requested up to {max_comments})")
         return all_comments
     
-    def _extract_comment_data(self, item: Dict) -> Dict:
+    @staticmethod
+    def _extract_comment_data(item: Dict) -> Dict:
         """Extract comment data from API response."""
         snippet = item['snippet']['topLevelComment']['snippet']
         return {
@@ -237,7 +281,8 @@ class YouTubeCommentsFetcher:
             'is_reply': False
         }
     
-    def _extract_reply_data(self, reply: Dict, parent_id: str) -> Dict:
+    @staticmethod
+    def _extract_reply_data(reply: Dict, parent_id: str) -> Dict:
         """Extract reply data from API response."""
         snippet = reply['snippet']
         return {
@@ -268,6 +313,11 @@ class YouTubeCommentsFetcher:
             logger.error(f"Error saving comments: {e}")
 
 
+def _is_permanent_error(e: HttpError) -> bool:
+    """Whether an error means the video's comments can't be fetched at all (rather than not right now)."""
+    return e.resp.status == 404 or b'commentsDisabled' in (e.content or b'')
+
+
 def get_video_comments(video_id: str, max_comments: int = 500):
     try:
         from config import YOUTUBE_API_KEY